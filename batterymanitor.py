@@ -3,15 +3,91 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import time
 from collections import deque
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.dates as mdates
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 import os
 import threading
+import queue
 import subprocess
 import re
+import math
+import glob
+import shutil
+import shlex
+import functools
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+_TEMP_RE = re.compile(r'([+-]?\d+\.?\d*)\s*°C')
+
+_SAMPLE_DTYPE = [('ts', 'f8'), ('pct', 'f4'), ('rate', 'f4'), ('plugged', '?')]
+
+_THERMAL_SOURCES = (
+    "/sys/class/thermal/thermal_zone0/temp",
+    "/sys/class/thermal/thermal_zone1/temp",
+    "/sys/class/hwmon/hwmon0/temp1_input",
+    "/sys/class/hwmon/hwmon1/temp1_input",
+    "/proc/acpi/thermal_zone/THM0/temperature",
+    "/proc/acpi/thermal_zone/THM1/temperature"
+)
+
+def _dump_json_line(obj):
+    if orjson:
+        return orjson.dumps(obj) + b'\n'
+    return json.dumps(obj).encode() + b'\n'
+
+_load_json_line = orjson.loads if orjson else json.loads
+
+@functools.lru_cache(maxsize=1)
+def _parse_os_release():
+    os_release = Path('/etc/os-release')
+    if not os_release.exists():
+        return {}
+    return dict(token.split('=', 1) for token in shlex.split(os_release.read_text(), comments=True) if '=' in token)
+
+def _temp_divisor_for(path):
+    if path.startswith('/proc/acpi/'):
+        return 1.0
+    if path.startswith('/sys/class/power_supply/'):
+        return 10.0
+    return 1000.0
+
+def _set_if_changed(var, value):
+    if var.get() != value:
+        var.set(value)
+
+@njit('f8(f8, f8, f8, f8)', cache=True)
+def _consumption_watts(last_percent, current_percent, elapsed, capacity_wh):
+    percent_per_hour = ((last_percent - current_percent) / elapsed) * 3600.0
+    return abs((percent_per_hour / 100.0) * capacity_wh)
+
+@njit('UniTuple(i8, 2)(f8, f8, b1, f8)', cache=True)
+def _time_remaining(percent, power, is_charging, capacity_wh):
+    if is_charging:
+        percent_needed = max(0.0, 100.0 - percent)
+    else:
+        percent_needed = max(0.0, percent)
+    if percent_needed <= 0:
+        return (0, 0)
+    hours_needed = ((percent_needed / 100.0) * capacity_wh) / power
+    if hours_needed > 100:
+        return (-1, -1)
+    hours = int(hours_needed)
+    return (hours, int((hours_needed - hours) * 60))
 
 class BatteryMonitor:
     def __init__(self, root):
@@ -21,31 +97,49 @@ class BatteryMonitor:
         
         self.update_interval = 1000
         self.save_to_json = False
-        self.history_file = "battery_history.json"
+        self.history_file = "battery_history.jsonl"
         self.update_job = None
         
         self.alerts_enabled = True
-        self.low_battery_alerts = {15: False, 10: False, 5: False}
+        self._alert_thresholds = (15, 10, 5)
+        self.low_battery_alerts = {percent: False for percent in self._alert_thresholds}
         self.overheat_threshold = 45
         self.charge_limit = 80
         self.last_alert_time = 0
         self.alert_cooldown = 300
+        self._alert_log = deque(maxlen=200)
         
         self.battery_path = self.find_battery_path()
         self.is_linux = os.path.exists('/sys/class/power_supply/')
+        self._sysfs_fds = {}
+        self._capacity_path = os.path.join(self.battery_path, 'capacity') if self.battery_path else None
+        self._status_path = os.path.join(self.battery_path, 'status') if self.battery_path else None
+        battery_temp_paths = [os.path.join(self.battery_path, name) for name in ('temp', 'temperature')] if self.battery_path else []
+        self._valid_temp_paths = [path for path in battery_temp_paths + list(_THERMAL_SOURCES) if os.path.exists(path)]
+        self._temp_source = self._discover_temp_source()
+        self._temp_divisor = _temp_divisor_for(self._temp_source) if self._temp_source else 1.0
+        self._alert_cmd = self.find_alert_command()
         
-        self.history = []
-        self.consumption_data = deque(maxlen=86400)
-        self.last_percent = None
-        self.last_update_time = time.time()
+        self._pending_history = []
+        self._since_flush = 0
+        self._buf = np.zeros(0, dtype=_SAMPLE_DTYPE)
+        self._head = 0
+        self._count = 0
+        self._percent_state = (None, time.time())
         self.last_temperature = 0
-        self.data_lock = threading.Lock()
+        self._last_temp_raw = None
+        self._last_temp_str = "Not available"
+        self.temp_refresh_ticks = 4
+        self._temp_tick = 0
+        self._last_charge_state = None
+        self._history_queue = queue.Queue()
         
         self.last_analytics_time = 0
         
         self.ask_user_preferences()
+        self.resize_sample_buffer()
         self.setup_gui()
-        self.start_data_collection()
+        self.start_history_writer()
         self.update_battery()
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -60,7 +154,8 @@ class BatteryMonitor:
                 self.update_job = None
             
             if self.save_to_json:
-                self.save_history()
+                self.flush_history()
+            self.close_sysfs_fds()
             self.root.destroy()
 
     def find_battery_path(self):
@@ -74,74 +169,91 @@ class BatteryMonitor:
                 return path
         return None
 
+    def _discover_temp_source(self):
+        for source in self._valid_temp_paths:
+            try:
+                float(self.read_sysfs(source))
+                return source
+            except (OSError, ValueError):
+                self._close_sysfs_fd(source)
+        try:
+            result = subprocess.run(['sensors'], capture_output=True, text=True, timeout=2)
+            if result.returncode == 0:
+                for line in result.stdout.split('\n'):
+                    if 'temp' in line.lower() and ':' in line:
+                        match = _TEMP_RE.search(line)
+                        if match:
+                            return self._find_hwmon_input(float(match.group(1)))
+        except:
+            pass
+        return None
+
+    def _find_hwmon_input(self, temperature):
+        for source in sorted(glob.glob('/sys/class/hwmon/hwmon*/temp*_input')):
+            try:
+                if abs(float(self.read_sysfs(source)) / 1000 - temperature) < 1.0:
+                    return source
+            except (OSError, ValueError):
+                pass
+            self._close_sysfs_fd(source)
+        return None
+
+    def read_sysfs(self, path):
+        fd = self._sysfs_fds.get(path)
+        if fd is not None:
+            try:
+                return os.pread(fd, 32, 0).decode().strip()
+            except OSError:
+                self._close_sysfs_fd(path)
+        fd = os.open(path, os.O_RDONLY)
+        self._sysfs_fds[path] = fd
+        try:
+            return os.pread(fd, 32, 0).decode().strip()
+        except OSError:
+            self._close_sysfs_fd(path)
+            raise
+
+    def _close_sysfs_fd(self, path):
+        fd = self._sysfs_fds.pop(path, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def close_sysfs_fds(self):
+        for path in list(self._sysfs_fds):
+            self._close_sysfs_fd(path)
+
     def get_linux_battery_info(self):
         if not self.battery_path:
             return None
         try:
             info = {}
-            with open(os.path.join(self.battery_path, 'capacity'), 'r') as f:
-                info['percent'] = float(f.read().strip())
-            with open(os.path.join(self.battery_path, 'status'), 'r') as f:
-                status = f.read().strip().upper()
-                info['power_plugged'] = status in ['CHARGING', 'FULL']
-                info['status'] = status
-            temp_paths = [
-                os.path.join(self.battery_path, 'temp'),
-                os.path.join(self.battery_path, 'temperature'),
-                '/sys/class/thermal/thermal_zone0/temp'
-            ]
-            for temp_path in temp_paths:
-                if temp_path and os.path.exists(temp_path):
-                    with open(temp_path, 'r') as f:
-                        temp = float(f.read().strip())
-                        if temp > 1000:
-                            temp = temp / 1000
-                        info['temperature'] = temp
-                        break
+            info['percent'] = float(self.read_sysfs(self._capacity_path))
+            status = self.read_sysfs(self._status_path).upper()
+            info['power_plugged'] = status in ['CHARGING', 'FULL']
+            info['status'] = status
+            if self._temp_source:
+                info['temperature'] = float(self.read_sysfs(self._temp_source)) / self._temp_divisor
             return info
         except Exception as e:
             print(f"Error reading Linux battery info: {e}")
             return None
 
     def get_linux_temperature(self):
-        temp_sources = [
-            f"{self.battery_path}/temp" if self.battery_path else None,
-            f"{self.battery_path}/temperature" if self.battery_path else None,
-            "/sys/class/thermal/thermal_zone0/temp",
-            "/sys/class/thermal/thermal_zone1/temp",
-            "/sys/class/hwmon/hwmon0/temp1_input",
-            "/sys/class/hwmon/hwmon1/temp1_input",
-            "/proc/acpi/thermal_zone/THM0/temperature",
-            "/proc/acpi/thermal_zone/THM1/temperature"
-        ]
-        for source in temp_sources:
-            if source and os.path.exists(source):
-                try:
-                    with open(source, 'r') as f:
-                        temp = float(f.read().strip())
-                        if temp > 1000:
-                            temp = temp / 1000
-                        return temp
-                except:
-                    continue
-        try:
-            result = subprocess.run(['sensors'], capture_output=True, text=True, timeout=2)
-            if result.returncode == 0:
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if 'temp' in line.lower() and ':' in line:
-                        match = re.search(r'([+-]?\d+\.\d+)°C', line)
-                        if match:
-                            return float(match.group(1))
-        except:
-            pass
+        if self._temp_source:
+            try:
+                return float(self.read_sysfs(self._temp_source)) / self._temp_divisor
+            except (OSError, ValueError):
+                pass
         return 0
 
     def ask_user_preferences(self):
         try:
             result = messagebox.askyesno(
                 "JSON Storage", 
-                "Do you want to save battery data to JSON file?\n\nThis will create a battery_history.json file to store your battery usage history."
+                "Do you want to save battery data to JSON file?\n\nThis will create a battery_history.jsonl file to store your battery usage history."
             )
             self.save_to_json = result
         except:
@@ -185,6 +297,7 @@ class BatteryMonitor:
             self.notebook.add(self.linux_frame, text="🐧 Linux Info")
             self.setup_linux_tab()
         
+        self.notebook.bind("<<NotebookTabChanged>>", self.render_alert_history)
         self.add_exit_button()
 
     def add_exit_button(self):
@@ -203,14 +316,7 @@ class BatteryMonitor:
         ttk.Label(path_frame, text="Battery Path:", font=("Arial", 10, "bold")).pack(anchor=tk.W)
         ttk.Label(path_frame, text=self.battery_path or "Not detected", font=("Arial", 9)).pack(anchor=tk.W)
         try:
-            with open('/etc/os-release', 'r') as f:
-                os_info = f.read()
-            lines = os_info.split('\n')
-            distro_info = {}
-            for line in lines:
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    distro_info[key] = value.strip('"')
+            distro_info = _parse_os_release()
             info_frame = ttk.Frame(linux_frame)
             info_frame.pack(fill=tk.X, pady=5)
             ttk.Label(info_frame, text="Distribution:", font=("Arial", 10, "bold")).pack(anchor=tk.W)
@@ -267,7 +373,7 @@ class BatteryMonitor:
         alerts_config_frame.pack(fill=tk.X, pady=5)
         ttk.Label(alerts_config_frame, text="Low Battery Alerts:", font=("Arial", 11, "bold")).pack(anchor=tk.W)
         self.alert_vars = {}
-        for percent in [15, 10, 5]:
+        for percent in self._alert_thresholds:
             var = tk.BooleanVar(value=True)
             self.alert_vars[percent] = var
             check = ttk.Checkbutton(alerts_config_frame, text=f"Alert at {percent}%", variable=var)
@@ -303,6 +409,13 @@ class BatteryMonitor:
         chart_frame = ttk.LabelFrame(self.analytics_frame, text="24-Hour Consumption History", padding="10")
         chart_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         self.fig1, self.ax1 = plt.subplots(figsize=(10, 4))
+        self.ax1.xaxis_date()
+        (self._line1,) = self.ax1.plot([], [], linewidth=2, alpha=0.7)
+        self.ax1.set_xlabel('Time')
+        self.ax1.set_ylabel('Power Consumption (W)')
+        self.ax1.set_title('24-Hour Power Consumption History')
+        self.ax1.grid(True, alpha=0.3)
+        self.ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
         self.canvas1 = FigureCanvasTkAgg(self.fig1, chart_frame)
         self.canvas1.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         stats_frame = ttk.LabelFrame(self.analytics_frame, text="Statistics", padding="10")
@@ -339,35 +452,27 @@ class BatteryMonitor:
         status_frame = ttk.Frame(settings_frame)
         status_frame.pack(fill=tk.X, pady=10)
         ttk.Label(status_frame, text=f"Current JSON file: {self.history_file}", font=("Arial", 9)).pack(anchor=tk.W)
-        ttk.Label(status_frame, text=f"Data points in memory: {len(self.consumption_data)}", font=("Arial", 9)).pack(anchor=tk.W)
+        ttk.Label(status_frame, text=f"Data points in memory: {self._count}", font=("Arial", 9)).pack(anchor=tk.W)
 
-    def start_data_collection(self):
-        def collect_data():
+    def start_history_writer(self):
+        def write_history():
             while True:
-                try:
-                    battery = psutil.sensors_battery()
-                    now_iso = datetime.now().isoformat()
-                    if battery:
-                        consumption = self.calculate_consumption_rate_threadsafe(battery.percent)
-                        data_point = {
-                            'timestamp': now_iso,
-                            'percent': battery.percent,
-                            'power_plugged': battery.power_plugged,
-                            'consumption_rate': consumption
-                        }
-                        with self.data_lock:
-                            self.consumption_data.append(data_point)
-                            if self.save_to_json:
-                                self.history.append(data_point)
-                                if len(self.history) % 60 == 0:
-                                    self.save_history()
-                    else:
-                        pass
-                except Exception as e:
-                    print(f"Data collection error: {e}")
-                time.sleep(1)
-        thread = threading.Thread(target=collect_data, daemon=True)
-        thread.start()
+                data_point = self._history_queue.get()
+                if data_point is None:
+                    self.save_history()
+                    self._since_flush = 0
+                    break
+                self._pending_history.append(data_point)
+                self._since_flush += 1
+                if self._since_flush >= 60:
+                    self.save_history()
+                    self._since_flush = 0
+        self._history_writer = threading.Thread(target=write_history, daemon=True)
+        self._history_writer.start()
+
+    def flush_history(self):
+        self._history_queue.put(None)
+        self._history_writer.join()
 
     def apply_alert_settings(self):
         try:
@@ -375,6 +480,7 @@ class BatteryMonitor:
             self.charge_limit = int(self.charge_limit_var.get())
             for percent in self.low_battery_alerts:
                 self.low_battery_alerts[percent] = False
+            self._last_charge_state = None
             messagebox.showinfo("Success", "Alert settings applied successfully!")
         except ValueError:
             messagebox.showerror("Error", "Please enter valid numbers for alert settings")
@@ -384,6 +490,7 @@ class BatteryMonitor:
             new_interval = int(self.interval_var.get())
             if 500 <= new_interval <= 10000:
                 self.update_interval = new_interval
+                self.resize_sample_buffer()
                 messagebox.showinfo("Success", f"Update interval set to {new_interval}ms")
             else:
                 messagebox.showerror("Error", "Please enter a value between 500 and 10000")
@@ -397,37 +504,53 @@ class BatteryMonitor:
 
     def toggle_alerts(self):
         self.alerts_enabled = self.alerts_var.get()
+        self._last_charge_state = None
         status = "enabled" if self.alerts_enabled else "disabled"
         messagebox.showinfo("Alerts", f"All alerts {status}")
 
     def add_alert_to_history(self, message):
-        self.alert_history_text.config(state=tk.NORMAL)
         timestamp = datetime.now().strftime("%H:%M:%S")
+        self._alert_log.append((timestamp, message))
+        if self.notebook.select() != str(self.alerts_frame):
+            return
+        self.alert_history_text.config(state=tk.NORMAL)
         self.alert_history_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        self.alert_history_text.delete('1.0', f'end-{self._alert_log.maxlen + 1}l')
+        self.alert_history_text.see(tk.END)
+        self.alert_history_text.config(state=tk.DISABLED)
+
+    def render_alert_history(self, event=None):
+        if self.notebook.select() != str(self.alerts_frame) or not self._alert_log:
+            return
+        self.alert_history_text.config(state=tk.NORMAL)
+        self.alert_history_text.delete('1.0', tk.END)
+        self.alert_history_text.insert(tk.END, ''.join(f"[{timestamp}] {message}\n" for timestamp, message in self._alert_log))
         self.alert_history_text.see(tk.END)
         self.alert_history_text.config(state=tk.DISABLED)
 
+    def find_alert_command(self):
+        methods = [
+            ['paplay', '/usr/share/sounds/freedesktop/stereo/alarm-clock-elapsed.oga'],
+            ['aplay', '/usr/share/sounds/alsa/Front_Center.wav'],
+            ['beep']
+        ]
+        for method in methods:
+            if shutil.which(method[0]) and all(os.path.exists(arg) for arg in method[1:]):
+                return method
+        return None
+
     def play_linux_alert_sound(self):
+        if not self._alert_cmd:
+            return
         try:
-            methods = [
-                ['paplay', '/usr/share/sounds/freedesktop/stereo/alarm-clock-elapsed.oga'],
-                ['aplay', '/usr/share/sounds/alsa/Front_Center.wav'],
-                ['beep']
-            ]
-            for method in methods:
-                try:
-                    subprocess.run(method, timeout=1, check=False)
-                    break
-                except:
-                    continue
-        except:
+            subprocess.Popen(self._alert_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
             pass
 
-    def check_low_battery_alerts(self, percent):
+    def check_low_battery_alerts(self, percent, current_time):
         if not self.alerts_enabled:
             return
-        current_time = time.time()
-        for alert_percent in sorted(self.low_battery_alerts.keys(), reverse=True):
+        for alert_percent in self._alert_thresholds:
             if (percent <= alert_percent and 
                 not self.low_battery_alerts[alert_percent] and
                 current_time - self.last_alert_time > self.alert_cooldown):
@@ -440,10 +563,9 @@ class BatteryMonitor:
                 self.last_alert_time = current_time
                 break
 
-    def check_overheat_alert(self, temperature):
+    def check_overheat_alert(self, temperature, current_time):
         if not self.alerts_enabled or temperature <= 0:
             return
-        current_time = time.time()
         if (temperature >= self.overheat_threshold and
             current_time - self.last_alert_time > self.alert_cooldown):
             message = f"🔥 OVERHEATING: Battery temperature is {temperature}°C!"
@@ -453,10 +575,9 @@ class BatteryMonitor:
             self.temp_alert_indicator.config(text="🔥", foreground="red")
             self.last_alert_time = current_time
 
-    def check_charge_limit_alert(self, percent, is_charging):
+    def check_charge_limit_alert(self, percent, is_charging, current_time):
         if not self.alerts_enabled or not is_charging:
             return
-        current_time = time.time()
         if (percent >= self.charge_limit and
             current_time - self.last_alert_time > self.alert_cooldown):
             message = f"🔌 CHARGE LIMIT: Battery reached {percent}% - Consider unplugging!"
@@ -470,12 +591,16 @@ class BatteryMonitor:
         if not self.is_linux:
             return "Not available"
         temp = self.get_linux_temperature()
+        if temp == self._last_temp_raw:
+            return self._last_temp_str
+        self._last_temp_raw = temp
         if temp > 0:
             self.last_temperature = temp
-            return f"{temp:.1f}°C / {(temp * 9/5) + 32:.1f}°F"
+            self._last_temp_str = f"{temp:.1f}°C / {(temp * 9/5) + 32:.1f}°F"
         else:
             self.last_temperature = 0
-            return "Not available"
+            self._last_temp_str = "Not available"
+        return self._last_temp_str
 
     def update_battery(self):
         try:
@@ -484,24 +609,40 @@ class BatteryMonitor:
             if battery:
                 percent = battery.percent
                 plugged = battery.power_plugged
-                consumption_rate = 0.0
-                with self.data_lock:
-                    if len(self.consumption_data) > 0:
-                        consumption_rate = self.consumption_data[-1].get('consumption_rate', 0.0)
-                self.percent_var.set(f"{percent:.2f}%")
+                consumption_rate = self.calculate_consumption_rate(percent)
+                self.append_sample(current_time, percent, consumption_rate, plugged)
+                if self.save_to_json:
+                    self._history_queue.put({
+                        'ts': current_time,
+                        'percent': percent,
+                        'power_plugged': plugged,
+                        'consumption_rate': consumption_rate
+                    })
+                _set_if_changed(self.percent_var, f"{percent:.2f}%")
                 self.progress['value'] = percent
                 status_text = "⚡ Charging" if plugged else "🔋 Discharging"
                 if percent == 100 and plugged:
                     status_text = "✅ Fully Charged"
-                self.status_var.set(status_text)
-                self.power_var.set(f"{consumption_rate:.1f} W")
-                self.time_full_var.set(self.calculate_time_remaining(percent, consumption_rate, True))
-                self.time_empty_var.set(self.calculate_time_remaining(percent, consumption_rate, False))
-                temp_display = self.get_temperature()
-                self.temp_var.set(temp_display)
-                self.check_low_battery_alerts(percent)
-                self.check_overheat_alert(self.last_temperature)
-                self.check_charge_limit_alert(percent, plugged)
+                _set_if_changed(self.status_var, status_text)
+                _set_if_changed(self.power_var, f"{consumption_rate:.1f} W")
+                _set_if_changed(self.time_full_var, self.calculate_time_remaining(percent, consumption_rate, True))
+                _set_if_changed(self.time_empty_var, self.calculate_time_remaining(percent, consumption_rate, False))
+                refresh_temp = self._temp_tick % self.temp_refresh_ticks == 0
+                self._temp_tick += 1
+                if refresh_temp:
+                    _set_if_changed(self.temp_var, self.get_temperature())
+                alerts_possible = (current_time - self.last_alert_time > self.alert_cooldown and
+                    not (percent > self._alert_thresholds[0] and not plugged and
+                         self.last_temperature < self.overheat_threshold - 5))
+                if alerts_possible:
+                    self.check_low_battery_alerts(percent, current_time)
+                    if refresh_temp:
+                        self.check_overheat_alert(self.last_temperature, current_time)
+                    charge_state = (percent, plugged)
+                    if (charge_state != self._last_charge_state and
+                        current_time - self.last_alert_time > self.alert_cooldown):
+                        self._last_charge_state = charge_state
+                        self.check_charge_limit_alert(percent, plugged, current_time)
                 if percent > 15 and self.alert_indicator.cget("text") == "⚠️":
                     self.alert_indicator.config(text="")
                 if self.last_temperature < self.overheat_threshold - 5 and self.temp_alert_indicator.cget("text") == "🔥":
@@ -512,32 +653,47 @@ class BatteryMonitor:
                     self.update_analytics()
                     self.last_analytics_time = current_time
             else:
-                self.status_var.set("No battery detected")
+                _set_if_changed(self.status_var, "No battery detected")
         except Exception as e:
             print(f"Error updating battery info: {e}")
         self.update_job = self.root.after(self.update_interval, self.update_battery)
 
-    def calculate_consumption_rate_threadsafe(self, current_percent):
+    def resize_sample_buffer(self):
+        size = math.ceil(86400 * 1000 / self.update_interval)
+        if size == len(self._buf):
+            return
+        samples = self.ordered_samples()[-size:]
+        self._buf = np.zeros(size, dtype=_SAMPLE_DTYPE)
+        self._buf[:len(samples)] = samples
+        self._count = len(samples)
+        self._head = self._count % size
+
+    def append_sample(self, ts, percent, rate, plugged):
+        self._buf[self._head] = (ts, percent, rate, bool(plugged))
+        self._head = (self._head + 1) % len(self._buf)
+        self._count = min(self._count + 1, len(self._buf))
+
+    def ordered_samples(self):
+        if self._count < len(self._buf):
+            return self._buf[:self._count]
+        return np.concatenate((self._buf[self._head:], self._buf[:self._head]))
+
+    def calculate_consumption_rate(self, current_percent):
         typical_capacity_wh = 50.0
         now = time.time()
-        with self.data_lock:
-            if self.last_percent is None:
-                self.last_percent = current_percent
-                self.last_update_time = now
-                return 0.0
-            elapsed = now - self.last_update_time
-            if elapsed <= 0:
-                return 0.0
-            percent_change = self.last_percent - current_percent
-            if percent_change == 0:
-                self.last_update_time = now
-                return 0.0
-            percent_per_hour = (percent_change / elapsed) * 3600.0
-            wh_per_hour = (percent_per_hour / 100.0) * typical_capacity_wh
-            watts = abs(wh_per_hour)
-            self.last_percent = current_percent
-            self.last_update_time = now
-            return round(watts, 2)
+        last_percent, last_update_time = self._percent_state
+        if last_percent is None:
+            self._percent_state = (current_percent, now)
+            return 0.0
+        elapsed = now - last_update_time
+        if elapsed <= 0:
+            return 0.0
+        if last_percent == current_percent:
+            self._percent_state = (last_percent, now)
+            return 0.0
+        watts = _consumption_watts(float(last_percent), float(current_percent), elapsed, typical_capacity_wh)
+        self._percent_state = (current_percent, now)
+        return round(watts, 2)
 
     def calculate_time_remaining(self, percent, power_watts, is_charging):
         try:
@@ -547,58 +703,62 @@ class BatteryMonitor:
         if power <= 0:
             return "--:--"
         typical_capacity = 50.0
-        if is_charging:
-            percent_needed = max(0.0, 100.0 - percent)
-        else:
-            percent_needed = max(0.0, percent)
-        if percent_needed <= 0:
-            return "00:00"
-        energy_needed_wh = (percent_needed / 100.0) * typical_capacity
-        hours_needed = energy_needed_wh / power if power > 0 else 0
-        if hours_needed > 100:
+        hours, minutes = _time_remaining(float(percent), power, bool(is_charging), typical_capacity)
+        if hours < 0:
             return "--:--"
-        hours = int(hours_needed)
-        minutes = int((hours_needed - hours) * 60)
         return f"{hours:02d}:{minutes:02d}"
 
     def update_analytics(self):
         try:
-            self.ax1.clear()
-            twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
-            with self.data_lock:
-                recent_data = [d for d in self.consumption_data if datetime.fromisoformat(d['timestamp']) >= twenty_four_hours_ago]
-            if recent_data:
-                timestamps = [datetime.fromisoformat(d['timestamp']) for d in recent_data]
-                consumption = [d['consumption_rate'] for d in recent_data]
-                self.ax1.plot(timestamps, consumption, linewidth=2, alpha=0.7)
-                self.ax1.set_xlabel('Time')
-                self.ax1.set_ylabel('Power Consumption (W)')
-                self.ax1.set_title('24-Hour Power Consumption History')
-                self.ax1.grid(True, alpha=0.3)
-                self.ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-                self.canvas1.draw()
-                avg_consumption = sum(consumption) / len(consumption) if consumption else 0
-                peak_consumption = max(consumption) if consumption else 0
-                self.daily_stats['avg_consumption'].set(f"Avg Consumption: {avg_consumption:.1f} W")
-                self.daily_stats['peak_consumption'].set(f"Peak Consumption: {peak_consumption:.1f} W")
-                self.daily_stats['data_points'].set(f"Data Points: {len(recent_data)}")
+            samples = self.ordered_samples()
+            ts = samples['ts']
+            cons = samples['rate'].astype(np.float64)
+            start = np.searchsorted(ts, time.time() - 86400)
+            ts = ts[start:]
+            cons = cons[start:]
+            if len(cons):
+                width_px = self.canvas1.get_tk_widget().winfo_width()
+                if width_px <= 1:
+                    width_px = 1200
+                ts_plot, cons_plot = self.downsample_minmax(ts, cons, width_px)
+                timestamps = mdates.date2num([datetime.fromtimestamp(t) for t in ts_plot])
+                self._line1.set_data(timestamps, cons_plot)
+                self.ax1.relim()
+                self.ax1.autoscale_view()
+                self.canvas1.draw_idle()
+                self.daily_stats['avg_consumption'].set(f"Avg Consumption: {cons.mean():.1f} W")
+                self.daily_stats['peak_consumption'].set(f"Peak Consumption: {cons.max():.1f} W")
+                self.daily_stats['data_points'].set(f"Data Points: {len(cons)}")
                 self.daily_stats['update_interval'].set(f"Update Interval: {self.update_interval}ms")
         except Exception as e:
             print(f"Error updating analytics: {e}")
 
+    def downsample_minmax(self, ts, values, buckets):
+        if len(values) <= 2 * buckets:
+            return ts, values
+        stride = len(values) // buckets
+        n = (len(values) // stride) * stride
+        value_buckets = values[:n].reshape(-1, stride)
+        ts_buckets = ts[:n].reshape(-1, stride)
+        ts_plot = np.column_stack((ts_buckets[:, 0], ts_buckets[:, -1])).ravel()
+        values_plot = np.column_stack((value_buckets.min(axis=1), value_buckets.max(axis=1))).ravel()
+        return np.concatenate((ts_plot, ts[n:])), np.concatenate((values_plot, values[n:]))
+
     def save_history(self):
         if self.save_to_json:
             try:
-                with open(self.history_file, 'w') as f:
-                    json.dump(self.history, f, indent=2)
+                with open(self.history_file, 'ab') as f:
+                    for data_point in self._pending_history:
+                        f.write(_dump_json_line({'timestamp': datetime.fromtimestamp(data_point['ts']).isoformat(), **data_point}))
+                self._pending_history.clear()
             except Exception as e:
                 print(f"Error saving history: {e}")
 
     def load_history(self):
         if os.path.exists(self.history_file) and self.save_to_json:
             try:
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
+                with open(self.history_file, 'rb') as f:
+                    return [_load_json_line(line) for line in f if line.strip()]
             except:
                 return []
         return []